@@ -1,63 +1,348 @@
-from fastapi import FastAPI, HTTPException, Depends
-from pydantic import BaseModel
 import os
-import pandas as pd
 import sqlite3
-import psycopg2
-import mysql.connector
-from typing import Dict, Any, Optional
-from contextlib import contextmanager
+import difflib
+import functools
+import hashlib
+import io
+import re
+import threading
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from contextlib import contextmanager, nullcontext
+import time
+import uuid
+
+# Schema text templates, filled with str.format while streaming catalog rows
+FIRST_TABLE_HEADER = "\n  Table: {}"
+TABLE_HEADER = "\n\n  Table: {}"
+SQLITE_COLUMN = "\n    - {} ({})"
+POSTGRES_COLUMN = "\n    - {} ({} {}{})"
+MYSQL_COLUMN = "\n    - {} ({} {}{}{}{})"
+DEFAULT_TEMPLATE = " DEFAULT {}"
+SUFFIX_TEMPLATE = " {}"
+
+# Catalog queries are built once at import rather than on every schema fetch
+SQLITE_SCHEMA_QUERY = """
+    SELECT 
+        m.name,
+        p.name,
+        p.type
+    FROM 
+        sqlite_master m
+        JOIN pragma_table_info(m.name) p
+    WHERE 
+        m.type = 'table'
+        AND m.name NOT LIKE 'sqlite_%'
+    ORDER BY 
+        m.name,
+        p.cid;
+"""
+
+POSTGRES_SCHEMA_QUERY = """
+    SELECT 
+        t.table_name,
+        c.column_name,
+        c.data_type,
+        c.column_default,
+        c.is_nullable
+    FROM 
+        information_schema.tables t
+        JOIN information_schema.columns c
+            ON t.table_schema = c.table_schema AND t.table_name = c.table_name
+    WHERE 
+        t.table_schema = %s
+        AND t.table_type = 'BASE TABLE'
+    ORDER BY 
+        t.table_name,
+        c.ordinal_position;
+"""
+
+MYSQL_SCHEMA_QUERY = """
+    SELECT 
+        TABLE_NAME,
+        COLUMN_NAME,
+        COLUMN_TYPE,
+        IS_NULLABLE,
+        COLUMN_DEFAULT,
+        COLUMN_KEY,
+        EXTRA
+    FROM 
+        information_schema.COLUMNS
+    WHERE 
+        TABLE_SCHEMA = DATABASE()
+    ORDER BY 
+        TABLE_NAME,
+        ORDINAL_POSITION;
+"""
+
+@functools.lru_cache(maxsize=None)
+def _get_driver(db_type: str):
+    """Import the pooling module for a server database the first time it is used"""
+    # Imported here so a SQLite-only process never loads the PostgreSQL or MySQL drivers
+    if db_type == "PostgreSQL":
+        import psycopg_pool
+        return psycopg_pool
+    if db_type == "MySQL":
+        import mysql.connector.pooling
+        return mysql.connector.pooling
+    raise ValueError(f"Unsupported database type: {db_type}")
+
+def to_records(results: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Turn the column names and row tuples of a query result into one dict per row"""
+    columns = results['columns']
+    return [dict(zip(columns, row)) for row in results['rows']]
 
 class DatabaseManager:
     def __init__(self):
-        self.connections = {}
+        # Pool sizes come from the environment so deployments can match them to worker counts
+        self.pg_pool_min = int(os.getenv("PG_POOL_MIN", "2"))
+        self.pg_pool_max = int(os.getenv("PG_POOL_MAX", "20"))
+        self.mysql_pool_size = int(os.getenv("MYSQL_POOL_SIZE", "10"))
+        self.mysql_pool_timeout = float(os.getenv("MYSQL_POOL_TIMEOUT", "30"))
+        self.pg_connect_timeout = int(os.getenv("PG_CONNECT_TIMEOUT", "10"))
+        self.pg_statement_cache_size = int(os.getenv("PG_STATEMENT_CACHE_SIZE", "1024"))
+        self.pool_idle_timeout = float(os.getenv("POOL_IDLE_TIMEOUT", "600"))
+        # Pool entries per connection key: the pool, its MySQL slots, the lock that guards opening it,
+        # how many callers are using it and when it was last handed back
+        self.pools: Dict[bytes, Dict[str, Any]] = {}
+        self._pools_lock = threading.Lock()
+        # SQLite connections are cheap, so each worker thread keeps its own
+        self._sqlite_local = threading.local()
+        # Formatted schema per connection key, stored with the time it was fetched
+        self.pg_schema = os.getenv("PG_SCHEMA", "public")
+        self.schema_ttl = float(os.getenv("SCHEMA_CACHE_TTL", "300"))
+        self._schema_cache: Dict[bytes, Tuple[float, str]] = {}
+        # Registered metrics by normalized name, with their last precomputed result
+        self._metrics: Dict[str, Dict[str, Any]] = {}
+
+    @staticmethod
+    def make_conn_key(db_data: Dict[str, Any]) -> bytes:
+        """Digest of everything that identifies a connection, so different credentials never share a pool"""
+        fields = ('db_type', 'db_host', 'db_port', 'db_name', 'db_user', 'db_password')
+        identity = "|".join(str(db_data.get(field)) for field in fields)
+        return hashlib.blake2b(identity.encode(), digest_size=16).digest()
+
+    @classmethod
+    def _conn_key(cls, db_data: Dict[str, Any]) -> bytes:
+        # Request configs arrive with the key precomputed
+        return db_data.get('conn_key') or cls.make_conn_key(db_data)
     
     @contextmanager
     def get_connection(self, db_data: Dict[str, Any]):
-        """Context manager for database connections"""
+        """Context manager that borrows a connection and hands it back on exit"""
         db_type = db_data['db_type']
-        conn_key = f"{db_type}_{db_data.get('db_name')}_{db_data.get('db_host')}"
+        conn_key = self._conn_key(db_data)
+        entry = None
+        conn = None
+        completed = False
         
         try:
-            if conn_key not in self.connections:
-                self.connections[conn_key] = self._create_connection(db_data)
-            yield self.connections[conn_key]
+            if db_type != "SQLite":
+                entry = self._checkout_pool(conn_key, db_data)
+            conn = self._acquire(conn_key, db_data, entry)
+            yield conn
+            completed = True
         except Exception as e:
             raise ConnectionError(f"Database connection failed: {str(e)}")
         finally:
-            if db_type == "SQLite":  # For SQLite, we need to commit after each operation
-                self.connections[conn_key].commit()
+            try:
+                if conn is not None:
+                    self._release(db_type, entry, conn, completed)
+            finally:
+                if entry is not None:
+                    self._checkin_pool(conn_key, entry)
+
+    def _checkout_pool(self, conn_key: bytes, db_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Find or open the pool for a key, counting the caller as a user so it is not closed underneath it"""
+        with self._pools_lock:
+            entry = self.pools.get(conn_key)
+            if entry is None:
+                entry = self.pools[conn_key] = {
+                    'db_type': db_data['db_type'],
+                    'pool': None,
+                    'slots': None,
+                    'lock': threading.Lock(),
+                    'users': 0,
+                    'used_at': time.monotonic()
+                }
+            entry['users'] += 1
+        
+        try:
+            if entry['pool'] is None:
+                # Opening a pool can take seconds, so only callers for the same key wait on it
+                with entry['lock']:
+                    if entry['pool'] is None:
+                        pool = self._create_connection(db_data)
+                        if db_data['db_type'] == "MySQL":
+                            # MySQL pools raise instead of waiting when empty, so checkouts queue on a semaphore
+                            entry['slots'] = threading.BoundedSemaphore(self.mysql_pool_size)
+                        entry['pool'] = pool
+        except Exception:
+            self._checkin_pool(conn_key, entry)
+            raise
+        return entry
+
+    def _checkin_pool(self, conn_key: bytes, entry: Dict[str, Any]) -> None:
+        with self._pools_lock:
+            entry['users'] -= 1
+            entry['used_at'] = time.monotonic()
+            # A pool that failed to open is dropped, so the next caller tries again from scratch
+            if entry['pool'] is None and entry['users'] == 0 and self.pools.get(conn_key) is entry:
+                del self.pools[conn_key]
+
+    def close_idle_pools(self) -> None:
+        """Close pools nobody has used for POOL_IDLE_TIMEOUT seconds, so stale credentials stop holding connections"""
+        cutoff = time.monotonic() - self.pool_idle_timeout
+        with self._pools_lock:
+            idle = [
+                conn_key for conn_key, entry in self.pools.items()
+                if entry['users'] == 0 and entry['pool'] is not None and entry['used_at'] < cutoff
+            ]
+            entries = [self.pools.pop(conn_key) for conn_key in idle]
+        for entry in entries:
+            self._close_pool(entry)
+
+    def close_pools(self) -> None:
+        """Close every pool, for shutdown"""
+        with self._pools_lock:
+            entries = list(self.pools.values())
+            self.pools.clear()
+        for entry in entries:
+            if entry['pool'] is not None:
+                self._close_pool(entry)
+
+    @staticmethod
+    def _close_pool(entry: Dict[str, Any]) -> None:
+        if entry['db_type'] == "PostgreSQL":
+            entry['pool'].close()
+        else:
+            # MySQLConnectionPool has no public close; this closes the connections it holds
+            entry['pool']._remove_connections()
+
+    def _acquire(self, conn_key: bytes, db_data: Dict[str, Any], entry: Optional[Dict[str, Any]]):
+        """Take a connection for the current caller"""
+        if db_data['db_type'] == "SQLite":
+            connections = getattr(self._sqlite_local, 'connections', None)
+            if connections is None:
+                connections = self._sqlite_local.connections = {}
+            if conn_key not in connections:
+                connections[conn_key] = self._create_connection(db_data)
+            return connections[conn_key]
+        
+        if db_data['db_type'] == "PostgreSQL":
+            return entry['pool'].getconn()
+        
+        slots = entry['slots']
+        if not slots.acquire(timeout=self.mysql_pool_timeout):
+            raise TimeoutError(f"No MySQL connection available after {self.mysql_pool_timeout}s")
+        try:
+            return entry['pool'].get_connection()
+        except Exception:
+            slots.release()
+            raise
+
+    def _release(self, db_type: str, entry: Optional[Dict[str, Any]], conn, completed: bool) -> None:
+        """Return a borrowed connection to its pool, committing its work if the caller succeeded"""
+        if db_type == "PostgreSQL":
+            # Autocommit connections have already committed; failed explicit transactions roll themselves back
+            entry['pool'].putconn(conn)
+        elif db_type == "MySQL":
+            try:
+                # The pool resets the session on close, which would discard uncommitted writes
+                if conn.in_transaction:
+                    if completed:
+                        conn.commit()
+                    else:
+                        conn.rollback()
+            finally:
+                try:
+                    conn.close()  # Pooled MySQL connections go back to the pool on close
+                finally:
+                    entry['slots'].release()
     
     def _create_connection(self, db_data: Dict[str, Any]):
-        """Create a new database connection"""
+        """Create a SQLite connection or a connection pool for server databases"""
         try:
             if db_data['db_type'] == "SQLite":
                 print("Connected to SQLite")
-                return sqlite3.connect(db_data['db_name'])
+                # Autocommit, so writes persist without a commit after every operation
+                return sqlite3.connect(db_data['db_name'], check_same_thread=False, isolation_level=None)
                 
             elif db_data['db_type'] == "PostgreSQL":
                 print("Connected to PostgreSQL")
-                return psycopg2.connect(
-                    host=db_data['db_host'],
-                    database=db_data['db_name'],
-                    user=db_data['db_user'],
-                    password=db_data['db_password'],
-                    port=db_data['db_port']
+                conn_kwargs = {
+                    'host': db_data['db_host'],
+                    'dbname': db_data['db_name'],
+                    'user': db_data['db_user'],
+                    'password': db_data['db_password'],
+                    'port': db_data['db_port'],
+                    'connect_timeout': self.pg_connect_timeout,
+                    # Plain reads should not leave a transaction open for the pool to roll back
+                    'autocommit': True,
+                    # Prepare a statement server-side from its second execution onward
+                    'prepare_threshold': 1
+                }
+                # The pool connects in the background and only logs failures, so connect once here
+                # to fail fast with the driver's own error for a bad host or password
+                import psycopg
+                psycopg.connect(**conn_kwargs).close()
+                pool = _get_driver("PostgreSQL").ConnectionPool(
+                    min_size=self.pg_pool_min,
+                    max_size=self.pg_pool_max,
+                    kwargs=conn_kwargs,
+                    configure=self._configure_postgres_connection,
+                    open=True
                 )
+                try:
+                    pool.wait(timeout=self.pg_connect_timeout)
+                except Exception:
+                    # Stop the pool's workers from retrying forever behind a pool nobody can use
+                    pool.close()
+                    raise
+                return pool
             
             elif db_data['db_type'] == "MySQL":
                 print("Connected to MYSQL")
-                return mysql.connector.connect(
+                return _get_driver("MySQL").MySQLConnectionPool(
+                    pool_name=self._conn_key(db_data).hex(),
+                    pool_size=self.mysql_pool_size,
                     host=db_data['db_host'],
                     database=db_data['db_name'],
                     user=db_data['db_user'],
                     password=db_data['db_password'],
                     port=db_data['db_port']
                 )
+            
+            raise ValueError(f"Unsupported database type: {db_data['db_type']}")
         except Exception as e:
             raise ConnectionError(f"Failed to connect to database: {str(e)}")
+
+    def _configure_postgres_connection(self, conn) -> None:
+        """Size the per-connection prepared statement cache"""
+        conn.prepared_max = self.pg_statement_cache_size
+
+    def ping(self, db_data: Dict[str, Any]) -> float:
+        """Run a trivial query and return the round trip time in seconds"""
+        with self.get_connection(db_data) as conn:
+            cursor = conn.cursor()
+            start_time = time.time()
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+            return time.time() - start_time
+
+    def get_cached_schema(self, db_data: Dict[str, Any]) -> Optional[str]:
+        """Return the cached schema if it is still fresh, without touching the database"""
+        cached = self._schema_cache.get(self._conn_key(db_data))
+        if cached is not None and time.monotonic() - cached[0] < self.schema_ttl:
+            return cached[1]
+        return None
+
     def get_schema(self, db_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Get database schema"""
+        """Get database schema, served from cache while it is fresh"""
+        schema = self.get_cached_schema(db_data)
+        if schema is not None:
+            return {'success': True, 'schema': schema}
+        
+        conn_key = self._conn_key(db_data)
         try:
             with self.get_connection(db_data) as conn:
                 cursor = conn.cursor()
@@ -72,116 +357,186 @@ class DatabaseManager:
                 else:
                     raise ValueError(f"Unsupported database type: {db_type}")
                 
+                self._schema_cache[conn_key] = (time.monotonic(), schema)
                 return {'success': True, 'schema': schema}
         except Exception as e:
             return {'success': False, 'message': f"Failed to get schema: {str(e)}"}
 
+    def invalidate_schema(self, db_data: Dict[str, Any]) -> None:
+        """Drop the cached schema so the next lookup re-reads it from the database"""
+        self._schema_cache.pop(self._conn_key(db_data), None)
+
+    @staticmethod
+    def _normalize_metric_name(text: str) -> str:
+        return " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
+
+    def register_metric(self, name: str, sql_query: str, refresh_s: float, db_data: Dict[str, Any]) -> None:
+        """Register a query whose result is precomputed and served from memory"""
+        self._metrics[self._normalize_metric_name(name)] = {
+            'sql': sql_query,
+            'refresh_s': refresh_s,
+            'db_data': db_data,
+            'conn_key': self._conn_key(db_data),
+            'last_ts': 0.0,
+            'value': None
+        }
+
+    def unregister_metric(self, name: str) -> None:
+        self._metrics.pop(self._normalize_metric_name(name), None)
+
+    def refresh_metric(self, name: str) -> Dict[str, Any]:
+        """Re-run a metric query and store its result"""
+        metric = self._metrics[self._normalize_metric_name(name)]
+        metric['value'] = self.execute_query(metric['sql'], metric['db_data'])
+        metric['last_ts'] = time.monotonic()
+        return metric['value']
+
+    def refresh_due_metrics(self) -> None:
+        """Refresh every metric whose result is older than its refresh interval"""
+        now = time.monotonic()
+        for name, metric in list(self._metrics.items()):
+            if now - metric['last_ts'] >= metric['refresh_s']:
+                try:
+                    self.refresh_metric(name)
+                except Exception as e:
+                    print(f"Failed to refresh metric {name}: {str(e)}")
+
+    def match_metric(self, question: str, db_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Return the precomputed metric whose name closely matches the question, if any"""
+        conn_key = self._conn_key(db_data)
+        names = [
+            name for name, metric in self._metrics.items()
+            if metric['conn_key'] == conn_key and metric['value'] is not None
+        ]
+        matches = difflib.get_close_matches(self._normalize_metric_name(question), names, n=1, cutoff=0.9)
+        return self._metrics[matches[0]] if matches else None
+
     def _get_sqlite_schema(self, cursor) -> str:
         """Get SQLite schema"""
-        schema_parts = []
+        buf = io.StringIO()
+        write = buf.write
         
-        # Get all tables
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%';")
-        tables = cursor.fetchall()
+        # Get every column of every table in one pass
+        cursor.execute(SQLITE_SCHEMA_QUERY)
         
-        for table in tables:
-            table_name = table[0]
-            cursor.execute(f"PRAGMA table_info('{table_name}');")
-            columns = cursor.fetchall()
+        current_table = None
+        for table_name, column_name, data_type in cursor:
+            if current_table != table_name:
+                write((FIRST_TABLE_HEADER if current_table is None else TABLE_HEADER).format(table_name))
+                current_table = table_name
             
-            # Format table schema
-            column_details = [f"    - {col[1]} ({col[2]})" for col in columns]
-            table_schema = f"\n  Table: {table_name}\n" + "\n".join(column_details)
-            schema_parts.append(table_schema)
+            write(SQLITE_COLUMN.format(column_name, data_type))
         
-        return "\n".join(schema_parts)
+        return buf.getvalue()
 
     def _get_postgres_schema(self, cursor) -> str:
         """Get PostgreSQL schema"""
-        schema_parts = []
+        buf = io.StringIO()
+        write = buf.write
         
         # Get all tables and their columns
-        cursor.execute("""
-            SELECT 
-                t.table_name,
-                c.column_name,
-                c.data_type,
-                c.column_default,
-                c.is_nullable
-            FROM 
-                information_schema.tables t
-                JOIN information_schema.columns c ON t.table_name = c.table_name
-            WHERE 
-                t.table_schema = 'public'
-                AND t.table_type = 'BASE TABLE'
-            ORDER BY 
-                t.table_name,
-                c.ordinal_position;
-        """)
+        cursor.execute(POSTGRES_SCHEMA_QUERY, (self.pg_schema,))
         
         current_table = None
-        column_details = []
-        
-        for row in cursor.fetchall():
-            table_name, column_name, data_type, default, nullable = row
-            
+        for table_name, column_name, data_type, default, nullable in cursor:
             if current_table != table_name:
-                if current_table is not None:
-                    schema_parts.append(f"\n  Table: {current_table}\n" + "\n".join(column_details))
+                write((FIRST_TABLE_HEADER if current_table is None else TABLE_HEADER).format(table_name))
                 current_table = table_name
-                column_details = []
             
-            nullable_str = "NULL" if nullable == "YES" else "NOT NULL"
-            default_str = f" DEFAULT {default}" if default else ""
-            column_details.append(f"    - {column_name} ({data_type} {nullable_str}{default_str})")
-        
-        if current_table is not None:
-            schema_parts.append(f"\n  Table: {current_table}\n" + "\n".join(column_details))
+            write(POSTGRES_COLUMN.format(
+                column_name,
+                data_type,
+                "NULL" if nullable == "YES" else "NOT NULL",
+                DEFAULT_TEMPLATE.format(default) if default else ""
+            ))
         
-        return "\n".join(schema_parts)
+        return buf.getvalue()
 
     def _get_mysql_schema(self, cursor) -> str:
         """Get MySQL schema"""
-        schema_parts = []
+        buf = io.StringIO()
+        write = buf.write
         
-        # Get all tables
-        cursor.execute("SHOW TABLES;")
-        tables = cursor.fetchall()
+        # Get every column of every table in one pass
+        cursor.execute(MYSQL_SCHEMA_QUERY)
         
-        for table in tables:
-            table_name = table[0]
-            cursor.execute(f"DESCRIBE `{table_name}`;")
-            columns = cursor.fetchall()
-            
-            # Format table schema
-            column_details = []
-            for col in columns:
-                field, type_, null, key, default, extra = col
-                nullable = "NULL" if null == "YES" else "NOT NULL"
-                default_str = f" DEFAULT {default}" if default else ""
-                key_str = f" {key}" if key else ""
-                extra_str = f" {extra}" if extra else ""
-                column_details.append(f"    - {field} ({type_} {nullable}{default_str}{key_str}{extra_str})")
+        current_table = None
+        for table_name, field, type_, null, default, key, extra in cursor:
+            if current_table != table_name:
+                write((FIRST_TABLE_HEADER if current_table is None else TABLE_HEADER).format(table_name))
+                current_table = table_name
             
-            table_schema = f"\n  Table: {table_name}\n" + "\n".join(column_details)
-            schema_parts.append(table_schema)
+            write(MYSQL_COLUMN.format(
+                field,
+                type_,
+                "NULL" if null == "YES" else "NOT NULL",
+                DEFAULT_TEMPLATE.format(default) if default else "",
+                SUFFIX_TEMPLATE.format(key) if key else "",
+                SUFFIX_TEMPLATE.format(extra) if extra else ""
+            ))
         
-        return "\n".join(schema_parts)
+        return buf.getvalue()
     
     def execute_query(self, sql_query, db_data):
+        return self.execute_queries([sql_query], db_data)[0]
+
+    def execute_queries(self, sql_queries: List[str], db_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Run several statements on one connection, pipelined on PostgreSQL"""
         try:
             with self.get_connection(db_data) as conn:
-                cursor = conn.cursor()
-                cursor.execute(sql_query)
-                if cursor:
-                    columns = [desc[0] for desc in cursor.description]
-
-                    rows = cursor.fetchall()
-   
-                    if rows:
-                        return pd.DataFrame(rows, columns=columns)
-                return None
+                if db_data['db_type'] == "PostgreSQL":
+                    # Send every statement before reading any result, so the batch costs one round trip
+                    cursors = []
+                    with conn.pipeline(), conn.transaction():
+                        for sql_query in sql_queries:
+                            cursor = conn.cursor()
+                            cursor.execute(sql_query)
+                            cursors.append(cursor)
+                    return [self._fetch_results(cursor) for cursor in cursors]
+                
+                results = []
+                for sql_query in sql_queries:
+                    cursor = conn.cursor()
+                    cursor.execute(sql_query)
+                    results.append(self._fetch_results(cursor))
+                return results
         except Exception as e:
             raise Exception(f"Query execution failed: {str(e)}")
-        
-        # return {"query_":sql_query }
\ No newline at end of file
+
+    def stream_query(self, sql_query: str, db_data: Dict[str, Any], batch_size: int = 1000) -> Iterator[List[Any]]:
+        """Yield the column names, then batches of rows, without holding the whole result in memory"""
+        db_type = db_data['db_type']
+        with self.get_connection(db_data) as conn:
+            # Server-side cursors only live inside a transaction, and the pool runs in autocommit
+            with conn.transaction() if db_type == "PostgreSQL" else nullcontext():
+                if db_type == "PostgreSQL":
+                    # A named cursor lives on the server, so rows arrive only as they are fetched
+                    cursor = conn.cursor(name=f"srv_{uuid.uuid4().hex}")
+                elif db_type == "MySQL":
+                    cursor = conn.cursor(buffered=False)
+                else:
+                    cursor = conn.cursor()
+                
+                try:
+                    cursor.execute(sql_query)
+                    if cursor.description is None:
+                        yield []
+                        return
+                    
+                    yield [desc[0] for desc in cursor.description]
+                    while True:
+                        rows = cursor.fetchmany(batch_size)
+                        if not rows:
+                            break
+                        yield rows
+                finally:
+                    if db_type == "MySQL":
+                        conn.consume_results()  # Rows left unread when the client disconnects early
+                    cursor.close()
+
+    def _fetch_results(self, cursor) -> Dict[str, Any]:
+        """Read an executed cursor into column names and row tuples"""
+        if cursor.description is None:
+            return {'columns': [], 'rows': []}
+        columns = [desc[0] for desc in cursor.description]
+        return {'columns': columns, 'rows': cursor.fetchall()}
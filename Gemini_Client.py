@@ -0,0 +1,52 @@
+import httpx
+import json
+from typing import Any, AsyncIterator, Dict
+
+GEMINI_URL = "https://generativelanguage.googleapis.com/v1beta/models/{model}:{method}"
+
+class GeminiClient:
+    def __init__(self, api_key: str, model: str = "gemini-pro"):
+        self.model = model
+        # One pooled HTTP/2 client, so concurrent calls multiplex over kept-alive connections
+        self.client = httpx.AsyncClient(
+            http2=True,
+            headers={"x-goog-api-key": api_key or ""},
+            limits=httpx.Limits(max_keepalive_connections=50, max_connections=100),
+            timeout=httpx.Timeout(60.0)
+        )
+
+    async def generate_content(self, prompt: str) -> str:
+        """Generate a complete response for the prompt"""
+        response = await self.client.post(self._url("generateContent"), json=self._body(prompt))
+        response.raise_for_status()
+        return self._text(response.json())
+
+    async def stream_content(self, prompt: str) -> AsyncIterator[str]:
+        """Yield response text as Gemini produces it"""
+        async with self.client.stream(
+            "POST",
+            self._url("streamGenerateContent"),
+            params={"alt": "sse"},
+            json=self._body(prompt)
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line.startswith("data:"):
+                    yield self._text(json.loads(line[5:]))
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+    def _url(self, method: str) -> str:
+        return GEMINI_URL.format(model=self.model, method=method)
+
+    @staticmethod
+    def _body(prompt: str) -> Dict[str, Any]:
+        return {"contents": [{"role": "user", "parts": [{"text": prompt}]}]}
+
+    @staticmethod
+    def _text(payload: Dict[str, Any]) -> str:
+        """Join the text parts of the first candidate"""
+        candidates = payload.get("candidates") or [{}]
+        parts = candidates[0].get("content", {}).get("parts", [])
+        return "".join(part.get("text", "") for part in parts)
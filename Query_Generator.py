@@ -1,41 +1,144 @@
 # QueryGenerator class needs a minor update to handle the new schema format
-from dotenv import load_dotenv
-import google.generativeai as genai
-from typing import Dict, Any, Optional
+from Gemini_Client import GeminiClient
+from typing import Dict, Any, AsyncIterator, List, Optional
+from cachetools import TTLCache
+import asyncio
+import hashlib
+import json
+import re
+from prompt import prompt_query
+
+# Filler words that do not change which SQL a question maps to
+STOPWORDS = frozenset({
+    "a", "an", "the", "please", "can", "could", "you", "me", "i", "want", "to",
+    "show", "list", "give", "get", "find", "display", "tell", "what", "which",
+    "is", "are", "was", "were", "all",
+})
+
+# Questions that usually break down into independent sub-queries
+COMPARISON_PATTERN = re.compile(r"\b(compare|comparison|versus|vs)\b|\bby \w+ and \w+")
+
+DECOMPOSE_INSTRUCTIONS = """
+        The question compares several things. Split it into independent SQL queries that can run in parallel,
+        one per thing being compared, and respond with only a JSON array of SQL strings.
+        """
+
+# Prompts are built once at import; each call only fills in schema and question
+PROMPT_TEMPLATE = prompt_query + "\n\nUser Question: {question}"
+DECOMPOSE_TEMPLATE = prompt_query + DECOMPOSE_INSTRUCTIONS + "\n\nUser Question: {question}"
 
 class QueryGenerator:
-    def __init__(self):
-        self.model = genai.GenerativeModel("gemini-pro")
+    def __init__(self, client: GeminiClient):
+        self.client = client
+        # Generated SQL keyed by schema hash and canonical question
+        self._sql_cache = TTLCache(maxsize=10_000, ttl=3600)
+        # Gemini calls in flight, so identical concurrent questions share one call
+        self._inflight: Dict[str, asyncio.Future] = {}
 
-    def generate_query(self, question: str, schema: Dict[str, Any]) -> str:
+    async def generate_query(self, question: str, schema: Dict[str, Any]) -> str:
         """Generate SQL query from natural language question"""
         # Extract schema string from the new schema response format
         schema_str = schema.get('schema', '') if isinstance(schema, dict) else schema
-        prompt = self._get_prompt_template(schema_str)
-        response = self.model.generate_content(prompt + "\n\nUser Question: " + question)
-        return response.text
-
-    def _get_prompt_template(self, schema: str) -> str:
-        """Get the prompt template for query generation"""
-        return f"""
-        You are an expert SQL assistant. You will help users write SQL queries that are efficient, secure and follow best practices.
-
-        Database Schema:
-        {schema}
-
-        Rules to follow:
-        1. Only write standardized SQL that works across major databases
-        2. Convert English questions into SQL queries based on the above schema
-        3. Add proper indexing suggestions when relevant
-        4. Use clear aliases and formatting
-        5. Consider performance implications
-        6. Avoid SQL injection risks
-        7. Include error handling where needed
-        8. SQL code should not have any syntax errors
-        9. Do not begin or end with any ``` or any other special characters
-        10. Only use tables and columns that exist in the schema above
-
-        Important note: Don't mention sql in your response, provide only the SQL query
-
-        Please provide only the SQL query without any explanations unless specifically asked for details.
-        """
+        key = self._cache_key(question, schema_str)
+        return await self._cached(key, lambda: self._generate(question, schema_str))
+
+    async def stream_query(self, question: str, schema: Dict[str, Any]) -> AsyncIterator[str]:
+        """Yield the SQL query piece by piece as Gemini produces it"""
+        schema_str = schema.get('schema', '') if isinstance(schema, dict) else schema
+        key = self._cache_key(question, schema_str)
+        
+        cached = self._sql_cache.get(key)
+        task = self._inflight.get(key)
+        if cached is None and task is not None:
+            # The same query is already being generated; wait for it rather than calling Gemini again
+            cached = await asyncio.shield(task)
+        if cached is not None:
+            yield cached
+            return
+
+        # Gemini is read by a task of its own, so the call still finishes, is cached and is
+        # shared with concurrent callers if this client disconnects mid-stream
+        chunks: asyncio.Queue = asyncio.Queue()
+        task = self._start(key, lambda: self._stream(question, schema_str, chunks))
+        while (chunk := await chunks.get()) is not None:
+            yield chunk
+        await asyncio.shield(task)
+
+    async def decompose_query(self, question: str, schema: Dict[str, Any]) -> List[str]:
+        """Generate independent SQL queries for a question that compares several things"""
+        schema_str = schema.get('schema', '') if isinstance(schema, dict) else schema
+        if not COMPARISON_PATTERN.search(question.lower()):
+            return [await self.generate_query(question, schema_str)]
+        
+        key = "batch:" + self._cache_key(question, schema_str)
+        return await self._cached(key, lambda: self._decompose(question, schema_str))
+
+    async def _cached(self, key: str, generate):
+        """Serve from cache, or share a single in-flight Gemini call per key"""
+        cached = self._sql_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        task = self._inflight.get(key) or self._start(key, generate)
+        # Shield so one cancelled request does not cancel the call others are waiting on
+        return await asyncio.shield(task)
+
+    def _start(self, key: str, generate) -> asyncio.Future:
+        """Run a Gemini call that concurrent requests for the same key can share"""
+        task = asyncio.ensure_future(generate())
+        self._inflight[key] = task
+        task.add_done_callback(lambda done: self._finish(key, done))
+        return task
+
+    def _finish(self, key: str, task: asyncio.Future) -> None:
+        self._inflight.pop(key, None)
+        if not task.cancelled() and task.exception() is None:
+            self._store(key, task.result())
+
+    def _store(self, key: str, result) -> None:
+        """Cache a generation unless it is blank, so an empty Gemini reply is retried next time"""
+        if isinstance(result, str):
+            usable = bool(result.strip())
+        else:
+            usable = bool(result) and all(query.strip() for query in result)
+        if usable:
+            self._sql_cache[key] = result
+
+    async def _generate(self, question: str, schema_str: str) -> str:
+        """Ask Gemini for the SQL query"""
+        prompt = PROMPT_TEMPLATE.format_map({'schema': schema_str, 'question': question})
+        return await self.client.generate_content(prompt)
+
+    async def _stream(self, question: str, schema_str: str, chunks: asyncio.Queue) -> str:
+        """Stream the SQL query from Gemini into chunks, ending with None, and return all of it"""
+        prompt = PROMPT_TEMPLATE.format_map({'schema': schema_str, 'question': question})
+        parts = []
+        try:
+            async for chunk in self.client.stream_content(prompt):
+                parts.append(chunk)
+                chunks.put_nowait(chunk)
+        finally:
+            chunks.put_nowait(None)
+        return "".join(parts)
+
+    async def _decompose(self, question: str, schema_str: str) -> List[str]:
+        """Ask Gemini for a JSON array of sub-queries, falling back to a single query"""
+        prompt = DECOMPOSE_TEMPLATE.format_map({'schema': schema_str, 'question': question})
+        text = await self.client.generate_content(prompt)
+        try:
+            queries = json.loads(text.strip().strip("`").removeprefix("json"))
+        except ValueError:
+            queries = None
+        if isinstance(queries, list) and queries and all(isinstance(q, str) for q in queries):
+            return queries
+        return [await self._generate(question, schema_str)]
+
+    @staticmethod
+    def canonicalize(question: str) -> str:
+        """Normalize case, whitespace, punctuation and filler words in a question"""
+        words = re.sub(r"[^\w\s]", " ", question.lower()).split()
+        return " ".join(word for word in words if word not in STOPWORDS)
+
+    def _cache_key(self, question: str, schema_str: str) -> str:
+        schema_hash = hashlib.blake2b(schema_str.encode(), digest_size=16).hexdigest()
+        return f"{schema_hash}:{self.canonicalize(question)}"
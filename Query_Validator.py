@@ -0,0 +1,47 @@
+import re
+import sqlglot
+from sqlglot import exp
+from sqlglot.errors import ParseError
+
+# sqlglot dialect names for the database types the API accepts
+DIALECTS = {
+    "SQLite": "sqlite",
+    "PostgreSQL": "postgres",
+    "MySQL": "mysql",
+}
+
+# Expressions that change data, schema or session state, including DML nested in CTEs
+WRITE_NODES = tuple(
+    getattr(exp, name) for name in (
+        "Insert", "Update", "Delete", "Merge", "Into", "Create", "Drop", "Alter", "AlterTable",
+        "TruncateTable", "Grant", "Set", "Copy", "LoadData", "Command",
+    )
+    if hasattr(exp, name)
+)
+
+class QueryValidator:
+    def __init__(self, max_rows: int = 1000):
+        self.max_rows = max_rows
+
+    def validate(self, sql_query: str, db_type: str, allow_writes: bool = False, limit_rows: bool = True) -> str:
+        """Reject unsafe SQL and return the query to run, with a LIMIT added to unbounded queries"""
+        dialect = DIALECTS.get(db_type)
+        try:
+            statements = [statement for statement in sqlglot.parse(sql_query, read=dialect) if statement is not None]
+        except ParseError as e:
+            raise ValueError(f"Invalid SQL query: {str(e)}")
+
+        if not statements:
+            raise ValueError("Empty SQL query")
+        if len(statements) > 1:
+            raise ValueError("Only one SQL statement can be executed at a time")
+
+        parsed = statements[0]
+        is_query = isinstance(parsed, exp.Query)  # SELECT, UNION and other set operations
+        if not allow_writes and (not is_query or parsed.find(*WRITE_NODES) is not None):
+            raise ValueError("Only read-only queries are allowed")
+
+        if limit_rows and is_query and not parsed.args.get("limit") and not parsed.args.get("locks"):
+            # Append to the original text so column names and functions reach the database as written
+            return re.sub(r"[\s;]+$", "", sql_query) + f"\nLIMIT {self.max_rows}"
+        return sql_query
@@ -1,22 +1,44 @@
 
 from fastapi import FastAPI, HTTPException, Depends
-from pydantic import BaseModel
 import os
-import pandas as pd
 # import sqlite3
 # import psycopg2
 # import mysql.connector
 from dotenv import load_dotenv
-import google.generativeai as genai
-from typing import Dict, Any, Optional
+from typing import Dict, Any, AsyncIterator, List, Optional
 # from  prompt import prompt_query
-from contextlib import contextmanager
+from contextlib import asynccontextmanager, suppress
+from anyio import to_thread
 from fastapi.middleware.cors import CORSMiddleware
-from Data_Base_Manager import DatabaseManager
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from Data_Base_Manager import DatabaseManager, to_records
 from Query_Generator import QueryGenerator
-import datetime , time
+from Gemini_Client import GeminiClient
+from Query_Validator import QueryValidator
+from models import BatchQuery, DBConfig, MetricConfig, UserQuery
+import asyncio
+import datetime
+import orjson
+from decimal import Decimal
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Driver calls run on anyio's worker threads; allow enough of them to keep every pooled connection busy
+    to_thread.current_default_thread_limiter().total_tokens = int(os.getenv("THREADPOOL_SIZE", "100"))
+    background_tasks = [
+        asyncio.create_task(refresh_metrics_loop()),
+        asyncio.create_task(close_idle_pools_loop())
+    ]
+    yield
+    for task in background_tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    await gemini_client.aclose()
+    await run_in_threadpool(db_manager.close_pools)
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -28,23 +50,75 @@ app.add_middleware(
 
 load_dotenv()
 
-genai.configure(api_key=os.getenv("GOOGLE_PRO_API_KEY"))
+db_manager = DatabaseManager()
+gemini_client = GeminiClient(api_key=os.getenv("GOOGLE_PRO_API_KEY"))
+query_generator = QueryGenerator(gemini_client)
+query_validator = QueryValidator(max_rows=int(os.getenv("QUERY_MAX_ROWS", "1000")))
 
-class DBConfig(BaseModel):
-    db_type: str
-    db_host: Optional[str] = None
-    db_port: Optional[str] = None
-    db_name: str
-    db_user: Optional[str] = None
-    db_password: Optional[str] = None
 
-class UserQuery(BaseModel):
-    question: str
-    sql_query:Optional[str] = None
-    db_data: DBConfig
+def validate_sql(sql_query: Optional[str], db_type: str, allow_writes: bool = False, limit_rows: bool = True) -> str:
+    """Validate SQL before it reaches the database, as a 400 error on rejection"""
+    if not sql_query or sql_query.isspace():
+        raise HTTPException(
+            status_code=400,
+            detail="No SQL query provided"
+        )
+    try:
+        return query_validator.validate(sql_query, db_type, allow_writes, limit_rows)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
 
-db_manager = DatabaseManager()
-query_generator = QueryGenerator()
+
+async def refresh_metrics_loop():
+    """Keep registered metrics precomputed in the background"""
+    interval = float(os.getenv("METRIC_POLL_INTERVAL", "1"))
+    while True:
+        await run_in_threadpool(db_manager.refresh_due_metrics)
+        await asyncio.sleep(interval)
+
+
+async def close_idle_pools_loop():
+    """Close connection pools whose credentials have stopped being used"""
+    interval = float(os.getenv("POOL_SWEEP_INTERVAL", "60"))
+    while True:
+        await asyncio.sleep(interval)
+        await run_in_threadpool(db_manager.close_idle_pools)
+
+
+def json_default(value: Any) -> Any:
+    """Encode driver types orjson does not handle natively, as jsonable_encoder would"""
+    if isinstance(value, Decimal):
+        return int(value) if value.as_tuple().exponent >= 0 else float(value)
+    if isinstance(value, bytes):
+        return value.decode()
+    if isinstance(value, datetime.timedelta):
+        return value.total_seconds()
+    return str(value)
+
+
+class RowsResponse(ORJSONResponse):
+    """Response for row-heavy payloads, encoded by orjson without a jsonable_encoder pass"""
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=json_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+def to_ndjson(columns: List[str], batches):
+    """Encode each batch of rows as newline-delimited JSON records"""
+    for rows in batches:
+        yield b"".join(
+            orjson.dumps(dict(zip(columns, row)), default=json_default, option=orjson.OPT_APPEND_NEWLINE)
+            for row in rows
+        )
+
+
+async def prepend(first: str, chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Yield text already read from a stream, then the rest of the stream"""
+    yield first
+    async for chunk in chunks:
+        yield chunk
 
 
 @app.get("/")
@@ -69,14 +143,11 @@ async def home_post():
 async def connect_db(db_data: DBConfig):
     """Test database connection"""
     try:
-        
-        with db_manager.get_connection(db_data.dict()) as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT 1") 
-            return {
-                "success": True,
-                "message": f"Successfully connected to {db_data.db_type} database"
-            }
+        await run_in_threadpool(db_manager.ping, db_data.params)
+        return {
+            "success": True,
+            "message": f"Successfully connected to {db_data.db_type} database"
+        }
     except ConnectionError as e:
         raise HTTPException(
             status_code=503,
@@ -92,7 +163,7 @@ async def connect_db(db_data: DBConfig):
 async def get_schema(db_data: DBConfig):
     """Get database schema"""
     try:
-        schema_result = db_manager.get_schema(db_data.dict())
+        schema_result = await run_in_threadpool(db_manager.get_schema, db_data.params)
         if not schema_result['success']:
             raise HTTPException(
                 status_code=400,
@@ -105,25 +176,89 @@ async def get_schema(db_data: DBConfig):
             detail=f"Failed to retrieve schema: {str(e)}"
         )
 
-@app.post("/generate_query")
-async def generate_sql(user_query: UserQuery):
-    """Generate SQL query from natural language"""
+@app.post("/refresh_schema")
+async def refresh_schema(db_data: DBConfig):
+    """Discard the cached schema and fetch it again"""
     try:
-        schema_result = db_manager.get_schema(user_query.db_data.dict())
+        db_manager.invalidate_schema(db_data.params)
+        schema_result = await run_in_threadpool(db_manager.get_schema, db_data.params)
         if not schema_result['success']:
             raise HTTPException(
                 status_code=400,
                 detail=schema_result['message']
             )
+        return schema_result
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to refresh schema: {str(e)}"
+        )
+
+@app.post("/register_metric")
+async def register_metric(metric: MetricConfig):
+    """Register a query whose result is precomputed and answered from memory"""
+    sql_query = validate_sql(metric.sql_query, metric.db_data.db_type)
+    try:
+        db_manager.register_metric(metric.name, sql_query, metric.refresh_s, metric.db_data.params)
+        results = await run_in_threadpool(db_manager.refresh_metric, metric.name)
+        return {
+            "success": True,
+            "name": metric.name,
+            "row_count": len(results['rows'])
+        }
+    except Exception as e:
+        db_manager.unregister_metric(metric.name)
+        raise HTTPException(
+            status_code=400,
+            detail=f"Failed to register metric: {str(e)}"
+        )
+
+@app.post("/generate_query")
+async def generate_sql(user_query: UserQuery, stream: bool = False):
+    """Generate SQL query from natural language, optionally streaming it as it is written"""
+    db_cfg = user_query.db_data.params
+    try:
+        metric = db_manager.match_metric(user_query.question, db_cfg)
+        if metric is not None:
+            return RowsResponse({
+                "success": True,
+                "sql_query": metric['sql'],
+                "db_type": user_query.db_data.db_type,
+                "results": to_records(metric['value']),
+                "row_count": len(metric['value']['rows'])
+            })
+        
+        schema = db_manager.get_cached_schema(db_cfg)
+        if schema is None:
+            schema_result = await run_in_threadpool(db_manager.get_schema, db_cfg)
+            if not schema_result['success']:
+                raise HTTPException(
+                    status_code=400,
+                    detail=schema_result['message']
+                )
+            schema = schema_result['schema']
         
-        query = query_generator.generate_query(user_query.question, schema_result)
+        if stream:
+            chunks = query_generator.stream_query(user_query.question, schema)
+            # Hold the response until Gemini writes something, so an empty generation is still a 400
+            query = ""
+            async for chunk in chunks:
+                query += chunk
+                if query.strip():
+                    break
+        else:
+            query = await query_generator.generate_query(user_query.question, schema)
         
         if not query or query.isspace():
             raise HTTPException(
                 status_code=400,
                 detail="Failed to generate valid SQL query"
             )
-            
+        
+        if stream:
+            return StreamingResponse(prepend(query, chunks), media_type="text/plain")
         return {
             "success": True,
             "sql_query": query,
@@ -138,10 +273,11 @@ async def generate_sql(user_query: UserQuery):
         )
 
 @app.post("/execute_query")
-async def execute_sql(user_query: UserQuery):
-    """Execute generated SQL query"""
+async def execute_sql(user_query: UserQuery, stream: bool = False):
+    """Execute generated SQL query, optionally streaming rows as NDJSON"""
+    db_cfg = user_query.db_data.params
     try:
-        schema_result = db_manager.get_schema(user_query.db_data.dict())
+        schema_result = await run_in_threadpool(db_manager.get_schema, db_cfg)
         if not schema_result['success']:
             raise HTTPException(
                 status_code=400,
@@ -155,14 +291,28 @@ async def execute_sql(user_query: UserQuery):
         #         detail="Failed to generate valid SQL query"
         #     )
         
-        results = db_manager.execute_query(user_query.sql_query, user_query.db_data.dict())
+        # Streamed results are not held in memory, so they do not need a row cap
+        sql_query = validate_sql(
+            user_query.sql_query,
+            user_query.db_data.db_type,
+            user_query.allow_writes,
+            limit_rows=not stream
+        )
         
-        return {
+        if stream:
+            batches = db_manager.stream_query(sql_query, db_cfg)
+            # Pull the column names now so query errors surface before the response starts
+            columns = await run_in_threadpool(next, batches)
+            return StreamingResponse(to_ndjson(columns, batches), media_type="application/x-ndjson")
+        
+        results = await run_in_threadpool(db_manager.execute_query, sql_query, db_cfg)
+        
+        return RowsResponse({
             "success": True,
-            "query": user_query.sql_query,
-            "results": results.to_dict(orient="records") if results is not None else [],
-            "row_count": len(results) if results is not None else 0
-        }
+            "query": sql_query,
+            "results": to_records(results),
+            "row_count": len(results['rows'])
+        })
                 
     except HTTPException:
         raise
@@ -172,18 +322,106 @@ async def execute_sql(user_query: UserQuery):
             detail=f"Query execution failed: {str(e)}"
         )
 
+@app.post("/ask")
+async def ask(user_query: UserQuery):
+    """Generate SQL for a question and execute it in one call"""
+    db_cfg = user_query.db_data.params
+    try:
+        metric = db_manager.match_metric(user_query.question, db_cfg)
+        if metric is not None:
+            return RowsResponse({
+                "success": True,
+                "sql_query": metric['sql'],
+                "results": to_records(metric['value']),
+                "row_count": len(metric['value']['rows'])
+            })
+        
+        schema = db_manager.get_cached_schema(db_cfg)
+        if schema is None:
+            schema_result = await run_in_threadpool(db_manager.get_schema, db_cfg)
+            if not schema_result['success']:
+                raise HTTPException(
+                    status_code=400,
+                    detail=schema_result['message']
+                )
+            schema = schema_result['schema']
+        
+        # No connection is held while Gemini works, so slow generations do not drain the pool
+        query = await query_generator.generate_query(user_query.question, schema)
+        sql_query = validate_sql(query, user_query.db_data.db_type, user_query.allow_writes)
+        results = await run_in_threadpool(db_manager.execute_query, sql_query, db_cfg)
+        
+        return RowsResponse({
+            "success": True,
+            "sql_query": sql_query,
+            "results": to_records(results),
+            "row_count": len(results['rows'])
+        })
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Question answering failed: {str(e)}"
+        )
+
+@app.post("/execute_batch")
+async def execute_batch(batch: BatchQuery):
+    """Execute several independent queries in one round trip"""
+    db_cfg = batch.db_data.params
+    try:
+        queries = batch.queries
+        if not queries:
+            if not batch.question:
+                raise HTTPException(
+                    status_code=400,
+                    detail="Provide either queries or a question"
+                )
+            schema_result = await run_in_threadpool(db_manager.get_schema, db_cfg)
+            if not schema_result['success']:
+                raise HTTPException(
+                    status_code=400,
+                    detail=schema_result['message']
+                )
+            queries = await query_generator.decompose_query(batch.question, schema_result)
+        
+        queries = [validate_sql(query, batch.db_data.db_type, batch.allow_writes) for query in queries]
+        results = await run_in_threadpool(db_manager.execute_queries, queries, db_cfg)
+        
+        return RowsResponse({
+            "success": True,
+            "results": [
+                {
+                    "query": query,
+                    "results": to_records(result),
+                    "row_count": len(result['rows'])
+                }
+                for query, result in zip(queries, results)
+            ]
+        })
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Batch execution failed: {str(e)}"
+        )
+
 @app.post("/execute_raw_query")
-async def execute_raw_sql(db_data: DBConfig, query: str):
+async def execute_raw_sql(db_data: DBConfig, query: str, allow_writes: bool = False):
     """Execute raw SQL query"""
     try:
-        results = db_manager.execute_query(query, db_data.dict())
+        query = validate_sql(query, db_data.db_type, allow_writes)
+        results = await run_in_threadpool(db_manager.execute_query, query, db_data.params)
         
-        return {
+        return RowsResponse({
             "success": True,
             "query": query,
-            "results": results.to_dict(orient="records") if results is not None else [],
-            "row_count": len(results) if results is not None else 0
-        }
+            "results": to_records(results),
+            "row_count": len(results['rows'])
+        })
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -194,19 +432,15 @@ async def execute_raw_sql(db_data: DBConfig, query: str):
 async def check_db_health(db_type: str, db_data: DBConfig):
     """Check database health status"""
     try:
-        with db_manager.get_connection(db_data.dict()) as conn:
-            cursor = conn.cursor()
-            start_time = time.time()
-            cursor.execute("SELECT 1")
-            response_time = time.time() - start_time
-            
-            return {
-                "success": True,
-                "database_type": db_type,
-                "status": "healthy",
-                "response_time_ms": round(response_time * 1000, 2),
-                "timestamp": datetime.datetime.now().isoformat()
-            }
+        response_time = await run_in_threadpool(db_manager.ping, db_data.params)
+        
+        return {
+            "success": True,
+            "database_type": db_type,
+            "status": "healthy",
+            "response_time_ms": round(response_time * 1000, 2),
+            "timestamp": datetime.datetime.now().isoformat()
+        }
     except Exception as e:
         raise HTTPException(
             status_code=503,
@@ -0,0 +1,39 @@
+from pydantic import BaseModel, ConfigDict
+from typing import Dict, Any, List, Optional
+from Data_Base_Manager import DatabaseManager
+import functools
+
+class DBConfig(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    db_type: str
+    db_host: Optional[str] = None
+    db_port: Optional[str] = None
+    db_name: str
+    db_user: Optional[str] = None
+    db_password: Optional[str] = None
+
+    @functools.cached_property
+    def params(self) -> Dict[str, Any]:
+        """Config as the dict DatabaseManager expects, dumped once per request"""
+        params = self.model_dump()
+        params['conn_key'] = DatabaseManager.make_conn_key(params)
+        return params
+
+class UserQuery(BaseModel):
+    question: str
+    sql_query:Optional[str] = None
+    allow_writes: bool = False
+    db_data: DBConfig
+
+class MetricConfig(BaseModel):
+    name: str
+    sql_query: str
+    refresh_s: float = 300
+    db_data: DBConfig
+
+class BatchQuery(BaseModel):
+    question: Optional[str] = None
+    queries: Optional[List[str]] = None
+    allow_writes: bool = False
+    db_data: DBConfig
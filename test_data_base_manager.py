@@ -0,0 +1,140 @@
+import sqlite3
+from pathlib import Path
+import pytest
+from Data_Base_Manager import DatabaseManager
+
+HERE = Path(__file__).parent
+
+
+def per_table_sqlite_schema(path):
+    """The schema text as the per-table PRAGMA formatter built it, with tables listed by name"""
+    conn = sqlite3.connect(path)
+    try:
+        tables = conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' ORDER BY name;"
+        ).fetchall()
+        schema_parts = []
+        for (table_name,) in tables:
+            columns = conn.execute(f"PRAGMA table_info('{table_name}');").fetchall()
+            column_details = [f"    - {col[1]} ({col[2]})" for col in columns]
+            schema_parts.append(f"\n  Table: {table_name}\n" + "\n".join(column_details))
+        return "\n".join(schema_parts)
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def db_manager():
+    return DatabaseManager()
+
+
+@pytest.mark.parametrize("db_name", ["company.db", "student.db"])
+def test_sqlite_schema_matches_per_table_output(db_manager, db_name):
+    path = str(HERE / db_name)
+    result = db_manager.get_schema({'db_type': "SQLite", 'db_name': path})
+    assert result['success']
+    assert result['schema'] == per_table_sqlite_schema(path)
+
+
+@pytest.fixture
+def student_db():
+    return {'db_type': "SQLite", 'db_name': str(HERE / "student.db")}
+
+
+@pytest.fixture
+def average_marks(db_manager, student_db):
+    db_manager.register_metric("Average marks", "SELECT AVG(marks) FROM student", 300, student_db)
+    db_manager.refresh_metric("Average marks")
+    return db_manager
+
+
+@pytest.mark.parametrize("question", ["average marks", "Average marks?", "average mark"])
+def test_match_metric_accepts_close_questions(average_marks, student_db, question):
+    metric = average_marks.match_metric(question, student_db)
+    assert metric is not None
+    assert metric['sql'] == "SELECT AVG(marks) FROM student"
+
+
+@pytest.mark.parametrize("question", ["average marx", "avg marks", "average marks by class"])
+def test_match_metric_rejects_questions_below_cutoff(average_marks, student_db, question):
+    assert average_marks.match_metric(question, student_db) is None
+
+
+def test_match_metric_ignores_other_connections(average_marks):
+    company_db = {'db_type': "SQLite", 'db_name': str(HERE / "company.db")}
+    assert average_marks.match_metric("average marks", company_db) is None
+
+
+def test_match_metric_skips_metrics_not_yet_computed(db_manager, student_db):
+    db_manager.register_metric("Average marks", "SELECT AVG(marks) FROM student", 300, student_db)
+    assert db_manager.match_metric("average marks", student_db) is None
+
+
+class CatalogCursor:
+    """Cursor that returns fixed catalog rows for whatever query it is given"""
+    def __init__(self, rows):
+        self.rows = rows
+
+    def execute(self, query, params=None):
+        pass
+
+    def __iter__(self):
+        return iter(self.rows)
+
+
+def joined_schema(rows, format_column):
+    """The schema text as the list-and-join formatters built it"""
+    schema_parts = []
+    current_table = None
+    column_details = []
+    for row in rows:
+        if current_table != row[0]:
+            if current_table is not None:
+                schema_parts.append(f"\n  Table: {current_table}\n" + "\n".join(column_details))
+            current_table = row[0]
+            column_details = []
+        column_details.append(format_column(*row[1:]))
+    if current_table is not None:
+        schema_parts.append(f"\n  Table: {current_table}\n" + "\n".join(column_details))
+    return "\n".join(schema_parts)
+
+
+POSTGRES_ROWS = [
+    ("departments", "id", "integer", "nextval('departments_id_seq'::regclass)", "NO"),
+    ("departments", "name", "text", None, "YES"),
+    ("employees", "id", "integer", None, "NO"),
+    ("employees", "hired", "date", "CURRENT_DATE", "YES"),
+]
+
+MYSQL_ROWS = [
+    ("departments", "id", "int", "NO", None, "PRI", "auto_increment"),
+    ("departments", "name", "varchar(100)", "YES", None, "", ""),
+    ("employees", "id", "int", "NO", None, "PRI", "auto_increment"),
+    ("employees", "dept_id", "int", "YES", "0", "MUL", ""),
+]
+
+
+def postgres_column(column_name, data_type, default, nullable):
+    nullable_str = "NULL" if nullable == "YES" else "NOT NULL"
+    default_str = f" DEFAULT {default}" if default else ""
+    return f"    - {column_name} ({data_type} {nullable_str}{default_str})"
+
+
+def mysql_column(field, type_, null, default, key, extra):
+    nullable = "NULL" if null == "YES" else "NOT NULL"
+    default_str = f" DEFAULT {default}" if default else ""
+    key_str = f" {key}" if key else ""
+    extra_str = f" {extra}" if extra else ""
+    return f"    - {field} ({type_} {nullable}{default_str}{key_str}{extra_str})"
+
+
+@pytest.mark.parametrize("rows", [POSTGRES_ROWS, POSTGRES_ROWS[:1], []])
+def test_postgres_schema_matches_joined_output(db_manager, rows):
+    schema = db_manager._get_postgres_schema(CatalogCursor(rows))
+    assert schema == joined_schema(rows, postgres_column)
+
+
+@pytest.mark.parametrize("rows", [MYSQL_ROWS, MYSQL_ROWS[:1], []])
+def test_mysql_schema_matches_joined_output(db_manager, rows):
+    schema = db_manager._get_mysql_schema(CatalogCursor(rows))
+    assert schema == joined_schema(rows, mysql_column)
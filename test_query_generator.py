@@ -0,0 +1,89 @@
+import asyncio
+import pytest
+from Query_Generator import QueryGenerator
+
+
+class StubClient:
+    """Stands in for GeminiClient, counting calls and returning a fixed reply"""
+    def __init__(self, reply="SELECT 1"):
+        self.reply = reply
+        self.calls = 0
+
+    async def generate_content(self, prompt):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return self.reply
+
+    async def stream_content(self, prompt):
+        self.calls += 1
+        for part in ("SELECT ", "1"):
+            await asyncio.sleep(0.01)
+            yield part
+
+
+@pytest.fixture
+def client():
+    return StubClient()
+
+
+@pytest.fixture
+def generator(client):
+    return QueryGenerator(client)
+
+
+@pytest.mark.parametrize("question, paraphrase", [
+    ("Show all students", "show me the students?"),
+    ("List employees  by salary", "employees by salary"),
+    ("What is the average marks?", "average marks"),
+])
+def test_paraphrases_share_a_cache_key(generator, question, paraphrase):
+    assert generator._cache_key(question, "schema") == generator._cache_key(paraphrase, "schema")
+
+
+def test_cache_key_depends_on_question_and_schema(generator):
+    key = generator._cache_key("students by class", "schema")
+    assert key != generator._cache_key("students by section", "schema")
+    assert key != generator._cache_key("students by class", "other schema")
+
+
+def test_repeated_question_is_served_from_cache(generator, client):
+    async def run():
+        await generator.generate_query("Show all students", "schema")
+        return await generator.generate_query("show me the students", "schema")
+
+    assert asyncio.run(run()) == "SELECT 1"
+    assert client.calls == 1
+
+
+def test_concurrent_identical_questions_make_one_call(generator, client):
+    async def run():
+        return await asyncio.gather(*(generator.generate_query("all students", "schema") for _ in range(10)))
+
+    assert asyncio.run(run()) == ["SELECT 1"] * 10
+    assert client.calls == 1
+
+
+def test_streamed_and_buffered_requests_share_one_call(generator, client):
+    async def collect(chunks):
+        return "".join([chunk async for chunk in chunks])
+
+    async def run():
+        return await asyncio.gather(
+            collect(generator.stream_query("all students", "schema")),
+            generator.generate_query("all students", "schema"),
+        )
+
+    assert asyncio.run(run()) == ["SELECT 1", "SELECT 1"]
+    assert client.calls == 1
+
+
+def test_blank_replies_are_not_cached(client):
+    client.reply = "  "
+    generator = QueryGenerator(client)
+
+    async def run():
+        await generator.generate_query("all students", "schema")
+        await generator.generate_query("all students", "schema")
+
+    asyncio.run(run())
+    assert client.calls == 2
@@ -0,0 +1,71 @@
+import pytest
+from Query_Validator import QueryValidator
+
+
+@pytest.fixture
+def validator():
+    return QueryValidator(max_rows=1000)
+
+
+@pytest.mark.parametrize("db_type, sql_query", [
+    ("SQLite", "SELECT * FROM student LIMIT 5"),
+    ("SQLite", "WITH a AS (SELECT 1 AS n) SELECT n FROM a LIMIT 5"),
+    ("PostgreSQL", "SELECT 1 UNION SELECT 2 LIMIT 5"),
+    ("MySQL", "SELECT IFNULL(a, 0) FROM t LIMIT 5"),
+])
+def test_accepts_read_queries_unchanged(validator, db_type, sql_query):
+    assert validator.validate(sql_query, db_type) == sql_query
+
+
+@pytest.mark.parametrize("db_type, sql_query", [
+    ("SQLite", "DELETE FROM student"),
+    ("SQLite", "INSERT INTO student VALUES ('a', 'b', 'c', 1)"),
+    ("SQLite", "UPDATE student SET marks = 0"),
+    ("SQLite", "DROP TABLE student"),
+    ("SQLite", "SELECT * INTO copy FROM student"),
+    ("SQLite", "ATTACH DATABASE 'x.db' AS x"),
+    ("SQLite", "DETACH x"),
+    ("SQLite", "PRAGMA writable_schema = ON"),
+    ("SQLite", "REINDEX"),
+    ("PostgreSQL", "WITH d AS (DELETE FROM t RETURNING *) SELECT * FROM d"),
+    ("PostgreSQL", "COMMIT"),
+    ("PostgreSQL", "DISCARD ALL"),
+    ("PostgreSQL", "NOTIFY c"),
+    ("MySQL", "KILL 5"),
+    ("MySQL", "USE other"),
+])
+def test_rejects_non_select(validator, db_type, sql_query):
+    with pytest.raises(ValueError):
+        validator.validate(sql_query, db_type)
+
+
+def test_rejects_multiple_statements(validator):
+    with pytest.raises(ValueError):
+        validator.validate("SELECT 1; DELETE FROM student", "SQLite")
+
+
+def test_rejects_empty_query(validator):
+    with pytest.raises(ValueError):
+        validator.validate(" ; ", "SQLite")
+
+
+def test_allows_writes_when_requested(validator):
+    sql_query = "DELETE FROM student"
+    assert validator.validate(sql_query, "SQLite", allow_writes=True) == sql_query
+
+
+@pytest.mark.parametrize("db_type, sql_query", [
+    ("SQLite", "select count(*), lower(name) from student"),
+    ("MySQL", "SELECT IFNULL(a,0) FROM t;"),
+    ("PostgreSQL", "SELECT 1 UNION SELECT 2"),
+    ("SQLite", "SELECT name FROM student -- all of them"),
+])
+def test_limits_unbounded_queries_keeping_their_text(validator, db_type, sql_query):
+    limited = validator.validate(sql_query, db_type)
+    assert limited.startswith(sql_query.rstrip(";"))
+    assert limited.endswith("\nLIMIT 1000")
+
+
+def test_skips_limit_when_disabled(validator):
+    sql_query = "SELECT * FROM student"
+    assert validator.validate(sql_query, "SQLite", limit_rows=False) == sql_query